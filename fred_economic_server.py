@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 
 import asyncio
+import importlib.util
 import json
+import logging
 import os
 import sys
+import time
 import traceback
-from typing import Any, Dict
-from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from datetime import datetime
 
 import httpx
 from mcp.server import NotificationOptions, Server
@@ -19,6 +22,13 @@ from mcp.types import (
     TextContent,
 )
 
+try:
+    import orjson  # Optional: faster JSON encoding/decoding
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
 
 
 class FredServer:
@@ -35,13 +45,164 @@ class FredServer:
 
         print(f"✅ API key: {self.api_key[:8]}...", file=sys.stderr)
 
+        # Pretty-print JSON output only when debugging
+        self.debug = os.getenv("DEBUG", "false").lower() == "true"
+
         self.base_url = "https://api.stlouisfed.org/fred"
         self.server = Server("fred-server")
 
+        # Shared HTTP client so keep-alive connections are reused across calls;
+        # HTTP/2 (needs httpx[http2]) multiplexes concurrent requests on one connection
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=30.0,
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+        )
+
+        # Response cache: (endpoint, params) -> (fetched_at, data)
+        self._cache: Dict[Tuple, Tuple[float, Dict[str, Any]]] = {}
+
+        # Search cache: (query, limit) -> (fetched_at, result JSON)
+        self._search_cache: Dict[Tuple[str, int], Tuple[float, str]] = {}
+
+        # Caps in-flight FRED requests; created on first use inside the event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
         # Set up handlers
+        self._tools = self._build_tools()
+        self._handlers = {
+            "get_fred_data": self._get_fred_data,
+            "get_fred_historical": self._get_fred_historical,
+            "search_fred": self._search_fred,
+            "fred_dashboard": self._fred_dashboard,
+            "get_multiple_series": self._get_multiple_series
+        }
         self._setup_handlers()
         print("✅ Handlers configured", file=sys.stderr)
 
+    def _build_tools(self) -> list[Tool]:
+        """Build tool definitions (done once; list_tools returns them as-is)"""
+        return [
+            Tool(
+                name="get_fred_data",
+                description="Get FRED economic data by series ID with full historical support",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "series_id": {
+                            "type": "string",
+                            "description": "FRED series ID (e.g., GDP, UNRATE, FEDFUNDS)"
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "description": "Number of observations (default: 50, max: 100000)",
+                            "default": 50
+                        },
+                        "start_date": {
+                            "type": "string",
+                            "description": "Start date in YYYY-MM-DD format (optional)"
+                        },
+                        "end_date": {
+                            "type": "string",
+                            "description": "End date in YYYY-MM-DD format (optional)"
+                        },
+                        "frequency": {
+                            "type": "string",
+                            "description": "Data frequency: d, w, bw, m, q, sa, a (optional)",
+                            "enum": ["d", "w", "bw", "m", "q", "sa", "a"]
+                        },
+                        "aggregation_method": {
+                            "type": "string",
+                            "description": "Aggregation method: avg, sum, eop (end of period)",
+                            "enum": ["avg", "sum", "eop"]
+                        },
+                        "include_metadata": {
+                            "type": "boolean",
+                            "description": "Include series title, units and frequency (default: true)",
+                            "default": True
+                        }
+                    },
+                    "required": ["series_id"]
+                }
+            ),
+            Tool(
+                name="get_fred_historical",
+                description="Get extensive historical data for analysis (4+ years)",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "series_id": {
+                            "type": "string",
+                            "description": "FRED series ID"
+                        },
+                        "years": {
+                            "type": "integer",
+                            "description": "Number of years back (default: 4)",
+                            "default": 4
+                        },
+                        "frequency": {
+                            "type": "string",
+                            "description": "q=quarterly, m=monthly, a=annual",
+                            "default": "q"
+                        }
+                    },
+                    "required": ["series_id"]
+                }
+            ),
+            Tool(
+                name="search_fred",
+                description="Search FRED database for series",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "query": {
+                            "type": "string",
+                            "description": "Search query"
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "description": "Number of results (default: 10)",
+                            "default": 10
+                        }
+                    },
+                    "required": ["query"]
+                }
+            ),
+            Tool(
+                name="fred_dashboard",
+                description="Get key economic indicators",
+                inputSchema={
+                    "type": "object",
+                    "properties": {}
+                }
+            ),
+            Tool(
+                name="get_multiple_series",
+                description="Get multiple FRED series at once for comparison",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "series_ids": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "List of FRED series IDs"
+                        },
+                        "start_date": {
+                            "type": "string",
+                            "description": "Start date in YYYY-MM-DD format"
+                        },
+                        "frequency": {
+                            "type": "string",
+                            "description": "Data frequency",
+                            "default": "q"
+                        }
+                    },
+                    "required": ["series_ids"]
+                }
+            )
+        ]
+
     def _setup_handlers(self):
         """Setup MCP handlers"""
 
@@ -49,120 +210,7 @@ class FredServer:
         async def list_tools() -> list[Tool]:
             """List available tools"""
             print("📋 Listing tools", file=sys.stderr)
-            return [
-                Tool(
-                    name="get_fred_data",
-                    description="Get FRED economic data by series ID with full historical support",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "series_id": {
-                                "type": "string",
-                                "description": "FRED series ID (e.g., GDP, UNRATE, FEDFUNDS)"
-                            },
-                            "limit": {
-                                "type": "integer",
-                                "description": "Number of observations (default: 50, max: 100000)",
-                                "default": 50
-                            },
-                            "start_date": {
-                                "type": "string",
-                                "description": "Start date in YYYY-MM-DD format (optional)"
-                            },
-                            "end_date": {
-                                "type": "string",
-                                "description": "End date in YYYY-MM-DD format (optional)"
-                            },
-                            "frequency": {
-                                "type": "string",
-                                "description": "Data frequency: d, w, bw, m, q, sa, a (optional)",
-                                "enum": ["d", "w", "bw", "m", "q", "sa", "a"]
-                            },
-                            "aggregation_method": {
-                                "type": "string",
-                                "description": "Aggregation method: avg, sum, eop (end of period)",
-                                "enum": ["avg", "sum", "eop"]
-                            }
-                        },
-                        "required": ["series_id"]
-                    }
-                ),
-                Tool(
-                    name="get_fred_historical",
-                    description="Get extensive historical data for analysis (4+ years)",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "series_id": {
-                                "type": "string",
-                                "description": "FRED series ID"
-                            },
-                            "years": {
-                                "type": "integer",
-                                "description": "Number of years back (default: 4)",
-                                "default": 4
-                            },
-                            "frequency": {
-                                "type": "string",
-                                "description": "q=quarterly, m=monthly, a=annual",
-                                "default": "q"
-                            }
-                        },
-                        "required": ["series_id"]
-                    }
-                ),
-                Tool(
-                    name="search_fred",
-                    description="Search FRED database for series",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "query": {
-                                "type": "string",
-                                "description": "Search query"
-                            },
-                            "limit": {
-                                "type": "integer",
-                                "description": "Number of results (default: 10)",
-                                "default": 10
-                            }
-                        },
-                        "required": ["query"]
-                    }
-                ),
-                Tool(
-                    name="fred_dashboard",
-                    description="Get key economic indicators",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {}
-                    }
-                ),
-                Tool(
-                    name="get_multiple_series",
-                    description="Get multiple FRED series at once for comparison",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "series_ids": {
-                                "type": "array",
-                                "items": {"type": "string"},
-                                "description": "List of FRED series IDs"
-                            },
-                            "start_date": {
-                                "type": "string",
-                                "description": "Start date in YYYY-MM-DD format"
-                            },
-                            "frequency": {
-                                "type": "string",
-                                "description": "Data frequency",
-                                "default": "q"
-                            }
-                        },
-                        "required": ["series_ids"]
-                    }
-                )
-            ]
+            return self._tools
 
         @self.server.call_tool()
         async def call_tool(name: str, arguments: Dict[str, Any]) -> list[TextContent]:
@@ -170,18 +218,8 @@ class FredServer:
             print(f"🔧 Tool: {name}", file=sys.stderr)
 
             try:
-                if name == "get_fred_data":
-                    result = await self._get_fred_data(arguments)
-                elif name == "get_fred_historical":
-                    result = await self._get_fred_historical(arguments)
-                elif name == "search_fred":
-                    result = await self._search_fred(arguments)
-                elif name == "fred_dashboard":
-                    result = await self._fred_dashboard(arguments)
-                elif name == "get_multiple_series":
-                    result = await self._get_multiple_series(arguments)
-                else:
-                    result = f"Unknown tool: {name}"
+                handler = self._handlers.get(name)
+                result = await handler(arguments) if handler else f"Unknown tool: {name}"
 
                 return [TextContent(type="text", text=result)]
 
@@ -191,42 +229,81 @@ class FredServer:
                 traceback.print_exc(file=sys.stderr)
                 return [TextContent(type="text", text=error_msg)]
 
+    def _to_json(self, data: Any) -> str:
+        """Serialize a tool result (compact unless DEBUG is set)"""
+        if orjson is not None:
+            option = orjson.OPT_INDENT_2 if self.debug else 0
+            return orjson.dumps(data, option=option).decode()
+        return json.dumps(data, indent=2 if self.debug else None)
+
+    def _normalize_series_id(self, series_id: str) -> str:
+        """Upper-case a series ID, skipping the copy when it already is"""
+        return series_id if series_id.isupper() else series_id.upper()
+
+    def _cache_ttl(self, endpoint: str, params: Dict[str, Any]) -> float:
+        """Seconds a response may be served from cache (0 = never cache)"""
+        if endpoint == "series":
+            return 86400  # Series metadata rarely changes
+        if endpoint == "series/observations" and params.get("limit") == 1:
+            return 3600  # Latest-value lookups (dashboard)
+        return 0
+
     async def _make_request(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """Make FRED API request"""
+        ttl = self._cache_ttl(endpoint, params)
+        key = (endpoint, tuple(sorted(params.items())))
+
+        if ttl:
+            cached = self._cache.get(key)
+            if cached and time.monotonic() - cached[0] < ttl:
+                logger.debug("💾 Cache hit: %s with params: %s", endpoint, params)
+                return cached[1]
+
+        logger.debug("🌐 API call: %s with params: %s", endpoint, params)
+
         params.update({
             'api_key': self.api_key,
             'file_type': 'json'
         })
 
-        url = f"{self.base_url}/{endpoint}"
-
-        print(f"🌐 API call: {endpoint} with params: {params}", file=sys.stderr)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(10)
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url, params=params)
+            async with self._semaphore:
+                # Back off and retry when FRED rate-limits us
+                for attempt in range(3):
+                    response = await self._client.get(f"/{endpoint}", params=params)
+                    if response.status_code != 429 or attempt == 2:
+                        break
+                    logger.warning("⏳ Rate limited on %s, retrying...", endpoint)
+                    await asyncio.sleep(2 ** attempt)
+
+            if response.status_code != 200:
+                raise Exception(f"API error: {response.status_code} - {response.text}")
 
-                if response.status_code != 200:
-                    raise Exception(f"API error: {response.status_code} - {response.text}")
+            data = orjson.loads(response.content) if orjson is not None else response.json()
 
-                data = response.json()
+            if 'error_code' in data:
+                raise Exception(f"FRED error: {data.get('error_message')}")
 
-                if 'error_code' in data:
-                    raise Exception(f"FRED error: {data.get('error_message')}")
+            if ttl:
+                self._cache[key] = (time.monotonic(), data)
 
-                return data
+            return data
 
         except Exception as e:
             raise Exception(f"Request failed: {str(e)}")
 
     async def _get_fred_data(self, args: Dict[str, Any]) -> str:
         """Get FRED series data with full historical support"""
-        series_id = args.get("series_id", "").upper()
+        series_id = self._normalize_series_id(args.get("series_id", ""))
         limit = min(args.get("limit", 50), 100000)  # Allow up to 100k observations
         start_date = args.get("start_date")
         end_date = args.get("end_date")
         frequency = args.get("frequency")
         aggregation_method = args.get("aggregation_method")
+        include_metadata = args.get("include_metadata", True)
 
         if not series_id:
             return "Error: series_id required"
@@ -249,25 +326,33 @@ class FredServer:
             if aggregation_method:
                 params["aggregation_method"] = aggregation_method
 
-            # Get data
-            data = await self._make_request("series/observations", params)
+            # Get data, plus series info concurrently when requested
+            if include_metadata:
+                data, info = await asyncio.gather(
+                    self._make_request("series/observations", params),
+                    self._make_request("series", {"series_id": series_id})
+                )
+            else:
+                data = await self._make_request("series/observations", params)
             observations = data.get("observations", [])
 
-            # Get series info
-            info = await self._make_request("series", {"series_id": series_id})
-            series_info = info.get("seriess", [{}])[0]
-
             # Filter out invalid values (FRED uses "." for missing data)
             valid_observations = [
                 obs for obs in observations
                 if obs.get("value") and obs.get("value") != "."
             ]
 
-            result = {
-                "series_id": series_id,
-                "title": series_info.get("title", "Unknown"),
-                "units": series_info.get("units", ""),
-                "frequency": series_info.get("frequency", ""),
+            result = {"series_id": series_id}
+
+            if include_metadata:
+                series_info = info.get("seriess", [{}])[0]
+                result.update({
+                    "title": series_info.get("title", "Unknown"),
+                    "units": series_info.get("units", ""),
+                    "frequency": series_info.get("frequency", "")
+                })
+
+            result.update({
                 "total_observations": len(valid_observations),
                 "date_range": {
                     "start": valid_observations[-1]["date"] if valid_observations else None,
@@ -275,10 +360,10 @@ class FredServer:
                 },
                 "latest_value": valid_observations[0] if valid_observations else None,
                 "all_data": valid_observations  # Return ALL data, not just recent
-            }
+            })
 
             print(f"✅ Got {len(valid_observations)} valid points for {series_id}", file=sys.stderr)
-            return json.dumps(result, indent=2)
+            return self._to_json(result)
 
         except Exception as e:
             error_msg = f"Error getting {series_id}: {str(e)}"
@@ -287,69 +372,91 @@ class FredServer:
 
     async def _get_fred_historical(self, args: Dict[str, Any]) -> str:
         """Get extensive historical data optimized for analysis"""
-        series_id = args.get("series_id", "").upper()
+        series_id = self._normalize_series_id(args.get("series_id", ""))
         years = args.get("years", 4)
         frequency = args.get("frequency", "q")
 
         if not series_id:
             return "Error: series_id required"
 
-        # Calculate start date
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=years * 365)
-
-        start_date_str = start_date.strftime("%Y-%m-%d")
-        end_date_str = end_date.strftime("%Y-%m-%d")
+        start_date_str, end_date_str = self._date_window(years)
 
         try:
-            params = {
-                "series_id": series_id,
-                "observation_start": start_date_str,
-                "observation_end": end_date_str,
-                "frequency": frequency,
-                "aggregation_method": "avg",
-                "limit": 100000  # Get all available data
-            }
-
-            # Get data
-            data = await self._make_request("series/observations", params)
-            observations = data.get("observations", [])
-
-            # Get series info
-            info = await self._make_request("series", {"series_id": series_id})
-            series_info = info.get("seriess", [{}])[0]
-
-            # Filter and sort data
-            valid_observations = [
-                obs for obs in observations
-                if obs.get("value") and obs.get("value") != "."
-            ]
-
-            # Sort chronologically (oldest first)
-            valid_observations.sort(key=lambda x: x["date"])
-
-            result = {
-                "series_id": series_id,
-                "title": series_info.get("title", "Unknown"),
-                "units": series_info.get("units", ""),
-                "frequency": frequency.upper(),
-                "years_requested": years,
-                "total_points": len(valid_observations),
-                "date_range": {
-                    "start": valid_observations[0]["date"] if valid_observations else None,
-                    "end": valid_observations[-1]["date"] if valid_observations else None
-                },
-                "historical_data": valid_observations
-            }
-
-            print(f"✅ Historical: {len(valid_observations)} points for {series_id} ({years} years)", file=sys.stderr)
-            return json.dumps(result, indent=2)
+            result = await self._fetch_historical(
+                series_id, years, frequency, start_date_str, end_date_str
+            )
+            return self._to_json(result)
 
         except Exception as e:
             error_msg = f"Error getting historical {series_id}: {str(e)}"
             print(f"❌ {error_msg}", file=sys.stderr)
             return error_msg
 
+    def _date_window(self, years: int) -> Tuple[str, str]:
+        """Return (start, end) dates as YYYY-MM-DD covering the last `years` years"""
+        end_date = datetime.now()
+        try:
+            start_date = end_date.replace(year=end_date.year - years)
+        except ValueError:
+            # Feb 29 with no leap day in the target year
+            start_date = end_date.replace(year=end_date.year - years, day=28)
+
+        return start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+
+    async def _fetch_historical(
+        self,
+        series_id: str,
+        years: int,
+        frequency: str,
+        observation_start: str,
+        observation_end: str
+    ) -> Dict[str, Any]:
+        """Fetch historical data for one series as a dict (raises on failure)"""
+        params = {
+            "series_id": series_id,
+            "observation_start": observation_start,
+            "observation_end": observation_end,
+            "frequency": frequency,
+            "aggregation_method": "avg",
+            "sort_order": "asc",  # Chronological (oldest first)
+            "limit": 100000  # Get all available data
+        }
+
+        # Get data and series info concurrently
+        data, info = await asyncio.gather(
+            self._make_request("series/observations", params),
+            self._make_request("series", {"series_id": series_id})
+        )
+        observations = data.get("observations", [])
+        series_info = info.get("seriess", [{}])[0]
+
+        # Filter out invalid values; FRED already returns them in date order
+        valid_observations = [
+            obs for obs in observations
+            if (value := obs.get("value")) and value != "."
+        ]
+
+        result = {
+            "series_id": series_id,
+            "title": series_info.get("title", "Unknown"),
+            "units": series_info.get("units", ""),
+            "frequency": frequency.upper(),
+            "years_requested": years,
+            "total_points": len(valid_observations),
+            "date_range": {
+                "start": valid_observations[0]["date"] if valid_observations else None,
+                "end": valid_observations[-1]["date"] if valid_observations else None
+            },
+            # Parallel arrays with values pre-parsed to floats
+            "historical_data": {
+                "dates": [obs["date"] for obs in valid_observations],
+                "values": [float(obs["value"]) for obs in valid_observations]
+            }
+        }
+
+        logger.debug("✅ Historical: %d points for %s (%s years)", len(valid_observations), series_id, years)
+        return result
+
     async def _get_multiple_series(self, args: Dict[str, Any]) -> str:
         """Get multiple series for comparison"""
         series_ids = args.get("series_ids", [])
@@ -359,25 +466,29 @@ class FredServer:
         if not series_ids:
             return "Error: series_ids required"
 
-        results = {}
+        # Compute the date window once for the whole batch
+        start_date_str, end_date_str = self._date_window(4)
+        if start_date:
+            start_date_str = start_date
+
+        # Use the historical fetch directly to skip a JSON round-trip;
+        # _make_request bounds how many of these hit FRED at once
+        raw = await asyncio.gather(
+            *(
+                self._fetch_historical(self._normalize_series_id(series_id), 4, frequency, start_date_str, end_date_str)
+                for series_id in series_ids
+            ),
+            return_exceptions=True
+        )
 
-        for series_id in series_ids:
-            try:
-                series_args = {
-                    "series_id": series_id,
-                    "frequency": frequency
-                }
-                if start_date:
-                    series_args["start_date"] = start_date
+        results = {}
 
-                # Use the historical method for each series
-                result_str = await self._get_fred_historical(series_args)
-                result_data = json.loads(result_str)
+        for series_id, result_data in zip(series_ids, raw):
+            if isinstance(result_data, Exception):
+                results[series_id] = {"error": str(result_data)}
+            else:
                 results[series_id] = result_data
 
-            except Exception as e:
-                results[series_id] = {"error": str(e)}
-
         combined_result = {
             "requested_series": series_ids,
             "frequency": frequency,
@@ -386,7 +497,7 @@ class FredServer:
         }
 
         print(f"✅ Multiple series: {len(series_ids)} series retrieved", file=sys.stderr)
-        return json.dumps(combined_result, indent=2)
+        return self._to_json(combined_result)
 
     async def _search_fred(self, args: Dict[str, Any]) -> str:
         """Search FRED series"""
@@ -396,6 +507,13 @@ class FredServer:
         if not query:
             return "Error: query required"
 
+        # Search results change on a day scale; serve repeats from cache for an hour
+        key = (query, limit)
+        cached = self._search_cache.get(key)
+        if cached and time.monotonic() - cached[0] < 3600:
+            logger.debug("💾 Search cache hit: '%s' (limit %s)", query, limit)
+            return cached[1]
+
         try:
             data = await self._make_request(
                 "series/search",
@@ -422,7 +540,9 @@ class FredServer:
             }
 
             print(f"✅ Found {len(series)} series for '{query}'", file=sys.stderr)
-            return json.dumps(result, indent=2)
+            result_json = self._to_json(result)
+            self._search_cache[key] = (time.monotonic(), result_json)
+            return result_json
 
         except Exception as e:
             return f"Search error: {str(e)}"
@@ -439,14 +559,21 @@ class FredServer:
             "SP500": "S&P 500"
         }
 
+        # Fetch all indicators concurrently
+        tasks = {
+            series_id: asyncio.create_task(self._make_request(
+                "series/observations",
+                {"series_id": series_id, "limit": 1, "sort_order": "desc"}
+            ))
+            for series_id in indicators
+        }
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
         results = {}
 
         for series_id, name in indicators.items():
             try:
-                data = await self._make_request(
-                    "series/observations",
-                    {"series_id": series_id, "limit": 1, "sort_order": "desc"}
-                )
+                data = tasks[series_id].result()
 
                 obs = data.get("observations", [])
                 latest = obs[0] if obs else {"date": "N/A", "value": "N/A"}
@@ -461,7 +588,7 @@ class FredServer:
                 results[series_id] = {"name": name, "error": str(e)}
 
         print(f"✅ Dashboard: {len(results)} indicators", file=sys.stderr)
-        return json.dumps({"dashboard": results}, indent=2)
+        return self._to_json({"dashboard": results})
 
     async def run(self):
         """Run the server"""
@@ -489,10 +616,18 @@ class FredServer:
             print(f"💥 Server error: {str(e)}", file=sys.stderr)
             traceback.print_exc(file=sys.stderr)
             raise
+        finally:
+            await self._client.aclose()
             
 
 def main():
     """Entry point"""
+    # Request-path logging goes to stderr; quiet unless LOG_LEVEL asks for more
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(os.getenv("LOG_LEVEL", "WARNING").upper())
+
     try:
         print("🏦 Enhanced FRED MCP Server v2.0", file=sys.stderr)
 